@@ -1,3 +1,5 @@
+import os
+
 from ryu.base import app_manager
 from ryu.controller import ofp_event
 from ryu.controller.handler import CONFIG_DISPATCHER, MAIN_DISPATCHER
@@ -9,9 +11,23 @@ from ryu.lib.packet import ether_types
 from ryu.lib.packet import udp
 from ryu.lib.packet import tcp
 from ryu.lib.packet import icmp
+from ryu.lib import hub
+
+from slice_cookies import SliceCookieMixin, make_cookie, NO_SLICE
+from slice_cookies import FLOW_CLASS_TABLE_MISS, FLOW_CLASS_MAC
+from slice_cookies import FLOW_CLASS_UDP_SLICE, FLOW_CLASS_UDP
+from slice_cookies import FLOW_CLASS_TCP, FLOW_CLASS_ICMP, FLOW_CLASS_FLOOD
+from slice_cookies import FLOW_CLASS_SLICE_FORWARD, FLOW_CLASS_SLICE_CLASSIFY
+
+# Tabelle della pipeline multi-table
+CLASSIFY_TABLE = 0
+FORWARD_TABLE = 1
+
+# Bit del campo metadata che contengono il numero di slice
+SLICE_METADATA_MASK = 0xFF
 
 
-class ServiceSlicing(app_manager.RyuApp):
+class ServiceSlicing(SliceCookieMixin, app_manager.RyuApp):
     # Versione di OpenFlow utilizzata
     OFP_VERSIONS = [ofproto_v1_3.OFP_VERSION]
 
@@ -44,6 +60,22 @@ class ServiceSlicing(app_manager.RyuApp):
         # Switch di bordo (edge / end switches)
         self.end_swtiches = [1, 4]
 
+        # Pipeline OpenFlow 1.3 multi-table sugli switch di bordo:
+        # tabella 0 classifica la slice (metadata), tabella 1 inoltra.
+        # Si abilita con SLICING_MULTI_TABLE=1 prima di ryu-manager.
+        self.multi_table = os.environ.get("SLICING_MULTI_TABLE", "0") == "1"
+
+        # Occupazione delle tabelle: table_occupancy[dpid][label] = {table_id: entry}
+        self.table_occupancy = {}
+        # Richieste di TableStats in attesa: (dpid, xid) -> label
+        self._pending_table_stats = {}
+
+        # Rilevazione periodica dell'occupazione (secondi, 0 = disattivata),
+        # in entrambe le modalità per confrontarle a parità di traffico
+        self.table_stats_interval = float(os.environ.get("SLICING_TABLE_STATS_INTERVAL", "0"))
+        if self.table_stats_interval > 0:
+            self.table_stats_thread = hub.spawn(self._table_stats_loop)
+
     @set_ev_cls(ofp_event.EventOFPSwitchFeatures, CONFIG_DISPATCHER)
     def switch_features_handler(self, ev):
         """Gestione dell’evento di connessione dello switch"""
@@ -51,6 +83,12 @@ class ServiceSlicing(app_manager.RyuApp):
         ofproto = datapath.ofproto
         parser = datapath.ofproto_parser
 
+        if self.multi_table and datapath.id in self.end_swtiches:
+            self._install_pipeline(datapath)
+            datapath.send_msg(parser.OFPBarrierRequest(datapath))
+            self.request_table_stats(datapath, "pipeline")
+            return
+
         # Flow di default (table-miss): inoltra i pacchetti al controller
         match = parser.OFPMatch()
         actions = [
@@ -59,22 +97,41 @@ class ServiceSlicing(app_manager.RyuApp):
                 ofproto.OFPCML_NO_BUFFER
             )
         ]
-        self.add_flow(datapath, 0, match, actions)
-
-    def add_flow(self, datapath, priority, match, actions):
-        """Installa una flow entry nello switch"""
+        self.add_flow(datapath, 0, match, actions,
+                      make_cookie(NO_SLICE, FLOW_CLASS_TABLE_MISS))
+
+    def add_flow(self, datapath, priority, match, actions, cookie=0,
+                 table_id=0, metadata=None, goto_table=None):
+        """
+        Installa una flow entry nello switch marcata con il cookie.
+        metadata e goto_table aggiungono le istruzioni WriteMetadata
+        e GotoTable usate dalla pipeline multi-table.
+        """
         ofproto = datapath.ofproto
         parser = datapath.ofproto_parser
 
-        inst = [
-            parser.OFPInstructionActions(
-                ofproto.OFPIT_APPLY_ACTIONS,
-                actions
+        inst = []
+        if actions:
+            inst.append(
+                parser.OFPInstructionActions(
+                    ofproto.OFPIT_APPLY_ACTIONS,
+                    actions
+                )
             )
-        ]
+        if metadata is not None:
+            inst.append(
+                parser.OFPInstructionWriteMetadata(
+                    metadata,
+                    SLICE_METADATA_MASK
+                )
+            )
+        if goto_table is not None:
+            inst.append(parser.OFPInstructionGotoTable(goto_table))
 
         mod = parser.OFPFlowMod(
             datapath=datapath,
+            cookie=cookie,
+            table_id=table_id,
             priority=priority,
             match=match,
             instructions=inst
@@ -82,6 +139,129 @@ class ServiceSlicing(app_manager.RyuApp):
 
         datapath.send_msg(mod)
 
+    def _install_pipeline(self, datapath):
+        """
+        Installa in modo proattivo la pipeline a due tabelle.
+        Le entry crescono come somma (protocolli + host + slice)
+        e non come prodotto host × porte × protocolli.
+        """
+        parser = datapath.ofproto_parser
+        dpid = datapath.id
+
+        # Tabella 0: classificazione del traffico in una slice
+        # Le entry di classificazione hanno una classe propria: modify e
+        # statistiche per slice agiscono solo sulle entry di inoltro
+        classifiers = [
+            # UDP verso porta slice dedicata
+            (3, 1, dict(ip_proto=0x11, udp_dst=self.slice_TCport)),
+            # UDP verso altre porte, TCP e ICMP
+            (2, 2, dict(ip_proto=0x11)),
+            (2, 2, dict(ip_proto=0x06)),
+            (2, 2, dict(ip_proto=0x01)),
+        ]
+        for priority, slice_number, fields in classifiers:
+            match = parser.OFPMatch(
+                eth_type=ether_types.ETH_TYPE_IP,
+                **fields
+            )
+            self.add_flow(datapath, priority, match, [],
+                          make_cookie(slice_number, FLOW_CLASS_SLICE_CLASSIFY),
+                          table_id=CLASSIFY_TABLE,
+                          metadata=slice_number,
+                          goto_table=FORWARD_TABLE)
+
+        # Table-miss: nessuna slice, solo consegna agli host locali
+        self.add_flow(datapath, 0, parser.OFPMatch(), [],
+                      make_cookie(NO_SLICE, FLOW_CLASS_TABLE_MISS),
+                      table_id=CLASSIFY_TABLE,
+                      goto_table=FORWARD_TABLE)
+
+        # Tabella 1: consegna agli host locali (indipendente dalla slice)
+        for mac, out_port in self.mac_to_port[dpid].items():
+            match = parser.OFPMatch(eth_dst=mac)
+            actions = [parser.OFPActionOutput(out_port)]
+            self.add_flow(datapath, 2, match, actions,
+                          make_cookie(NO_SLICE, FLOW_CLASS_MAC),
+                          table_id=FORWARD_TABLE)
+
+        # Tabella 1: inoltro verso il core in base alla slice
+        for slice_number, out_port in self.slice_ports[dpid].items():
+            match = parser.OFPMatch(
+                metadata=(slice_number, SLICE_METADATA_MASK)
+            )
+            actions = [parser.OFPActionOutput(out_port)]
+            self.add_flow(datapath, 1, match, actions,
+                          make_cookie(slice_number, FLOW_CLASS_SLICE_FORWARD),
+                          table_id=FORWARD_TABLE)
+
+    def modify_slice_flows(self, slice_id, actions_for, flow_class=None,
+                           dpid=None, table_id=None):
+        """
+        Come SliceCookieMixin.modify_slice_flows; con pipeline multi-table
+        modifica per default solo le entry di inoltro della tabella 1,
+        lasciando intatte WriteMetadata e GotoTable della classificazione.
+        """
+        if self.multi_table and flow_class is None:
+            flow_class = FLOW_CLASS_SLICE_FORWARD
+        if table_id is None:
+            table_id = FORWARD_TABLE if self.multi_table else 0
+        super(ServiceSlicing, self).modify_slice_flows(
+            slice_id, actions_for, flow_class, dpid, table_id
+        )
+
+    def request_slice_stats(self, slice_id, flow_class=None, dpid=None):
+        """
+        Come SliceCookieMixin.request_slice_stats; con pipeline multi-table
+        conta per default solo le entry di inoltro, così ogni pacchetto
+        è contato una sola volta e non anche dalla classificazione.
+        """
+        if self.multi_table and flow_class is None:
+            flow_class = FLOW_CLASS_SLICE_FORWARD
+        super(ServiceSlicing, self).request_slice_stats(slice_id, flow_class, dpid)
+
+    def _table_stats_loop(self):
+        while True:
+            hub.sleep(self.table_stats_interval)
+            self.request_table_occupancy("periodic")
+
+    def request_table_occupancy(self, label="current", dpid=None):
+        """
+        Richiede l'occupazione delle tabelle di tutti gli switch connessi
+        (o del solo dpid), in modalità piatta come in multi-table.
+        """
+        for datapath in self._target_datapaths(dpid):
+            self.request_table_stats(datapath, label)
+
+    def request_table_stats(self, datapath, label):
+        """
+        Richiede l'occupazione delle tabelle dello switch.
+        Il risultato arriva in self.table_occupancy[dpid][label].
+        """
+        parser = datapath.ofproto_parser
+        req = parser.OFPTableStatsRequest(datapath, 0)
+        datapath.send_msg(req)
+        self._pending_table_stats[(datapath.id, req.xid)] = label
+
+    @set_ev_cls(ofp_event.EventOFPTableStatsReply, [CONFIG_DISPATCHER, MAIN_DISPATCHER])
+    def _table_stats_reply_handler(self, ev):
+        """Salva e registra il numero di entry attive per tabella"""
+        msg = ev.msg
+        dpid = msg.datapath.id
+        label = self._pending_table_stats.pop((dpid, msg.xid), None)
+        if label is None:
+            return
+
+        occupancy = {
+            stat.table_id: stat.active_count
+            for stat in msg.body if stat.active_count
+        }
+        self.table_occupancy.setdefault(dpid, {})
+        self.table_occupancy[dpid][label] = occupancy
+        self.logger.info(
+            "dpid=%s occupazione tabelle (%s): %s totale=%d",
+            dpid, label, occupancy, sum(occupancy.values())
+        )
+
     def _send_package(self, msg, datapath, in_port, actions):
         """Invia il pacchetto immediatamente tramite PacketOut"""
         data = None
@@ -131,7 +311,8 @@ class ServiceSlicing(app_manager.RyuApp):
                     eth_dst=dst
                 )
 
-                self.add_flow(datapath, 1, match, actions)
+                self.add_flow(datapath, 1, match, actions,
+                              make_cookie(NO_SLICE, FLOW_CLASS_MAC))
                 self._send_package(msg, datapath, in_port, actions)
 
             # UDP verso porta slice dedicata
@@ -154,7 +335,8 @@ class ServiceSlicing(app_manager.RyuApp):
                     datapath.ofproto_parser.OFPActionOutput(out_port)
                 ]
 
-                self.add_flow(datapath, 2, match, actions)
+                self.add_flow(datapath, 2, match, actions,
+                              make_cookie(slice_number, FLOW_CLASS_UDP_SLICE))
                 self._send_package(msg, datapath, in_port, actions)
 
             # UDP verso altre porte
@@ -175,7 +357,8 @@ class ServiceSlicing(app_manager.RyuApp):
                     datapath.ofproto_parser.OFPActionOutput(out_port)
                 ]
 
-                self.add_flow(datapath, 1, match, actions)
+                self.add_flow(datapath, 1, match, actions,
+                              make_cookie(slice_number, FLOW_CLASS_UDP))
                 self._send_package(msg, datapath, in_port, actions)
 
             # Traffico TCP
@@ -195,7 +378,8 @@ class ServiceSlicing(app_manager.RyuApp):
                     datapath.ofproto_parser.OFPActionOutput(out_port)
                 ]
 
-                self.add_flow(datapath, 1, match, actions)
+                self.add_flow(datapath, 1, match, actions,
+                              make_cookie(slice_number, FLOW_CLASS_TCP))
                 self._send_package(msg, datapath, in_port, actions)
 
             # Traffico ICMP
@@ -215,7 +399,8 @@ class ServiceSlicing(app_manager.RyuApp):
                     datapath.ofproto_parser.OFPActionOutput(out_port)
                 ]
 
-                self.add_flow(datapath, 1, match, actions)
+                self.add_flow(datapath, 1, match, actions,
+                              make_cookie(slice_number, FLOW_CLASS_ICMP))
                 self._send_package(msg, datapath, in_port, actions)
 
         # Flood sui nodi non terminali
@@ -229,5 +414,6 @@ class ServiceSlicing(app_manager.RyuApp):
                 in_port=in_port
             )
 
-            self.add_flow(datapath, 1, match, actions)
+            self.add_flow(datapath, 1, match, actions,
+                          make_cookie(NO_SLICE, FLOW_CLASS_FLOOD))
             self._send_package(msg, datapath, in_port, actions)
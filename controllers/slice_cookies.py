@@ -0,0 +1,184 @@
+from ryu.controller import ofp_event
+from ryu.controller.handler import MAIN_DISPATCHER, DEAD_DISPATCHER
+from ryu.controller.handler import set_ev_cls
+
+# Layout del cookie OpenFlow (64 bit):
+#   bit 63..32 -> identificativo della slice (0 = nessuna slice)
+#   bit 31..0  -> classe del flow
+SLICE_SHIFT = 32
+SLICE_MASK = 0xFFFFFFFF00000000
+CLASS_MASK = 0x00000000FFFFFFFF
+FULL_MASK = 0xFFFFFFFFFFFFFFFF
+
+# Slice "nulla": table-miss e flow non associati ad una slice
+NO_SLICE = 0
+
+# Classi di flow installate dai controller
+FLOW_CLASS_TABLE_MISS = 0
+FLOW_CLASS_MAC = 1
+FLOW_CLASS_UDP_SLICE = 2
+FLOW_CLASS_UDP = 3
+FLOW_CLASS_TCP = 4
+FLOW_CLASS_ICMP = 5
+FLOW_CLASS_FLOOD = 6
+FLOW_CLASS_SLICE_FORWARD = 7
+FLOW_CLASS_SLICE_CLASSIFY = 8
+
+
+def make_cookie(slice_id, flow_class):
+    """Codifica slice e classe del flow in un cookie OpenFlow"""
+    return ((slice_id << SLICE_SHIFT) & SLICE_MASK) | (flow_class & CLASS_MASK)
+
+
+def cookie_mask(slice_id=None, flow_class=None):
+    """
+    Restituisce la coppia (cookie, mask) per selezionare i flow
+    di una slice e/o di una classe. I campi a None non vengono filtrati.
+    """
+    cookie = 0
+    mask = 0
+    if slice_id is not None:
+        cookie |= (slice_id << SLICE_SHIFT) & SLICE_MASK
+        mask |= SLICE_MASK
+    if flow_class is not None:
+        cookie |= flow_class & CLASS_MASK
+        mask |= CLASS_MASK
+    return cookie, mask
+
+
+def slice_of(cookie):
+    return (cookie & SLICE_MASK) >> SLICE_SHIFT
+
+
+def flow_class_of(cookie):
+    return cookie & CLASS_MASK
+
+
+class SliceCookieMixin(object):
+    """
+    Operazioni bulk sui flow marcati con cookie di slice.
+    Da usare come prima base di una RyuApp:
+    class App(SliceCookieMixin, app_manager.RyuApp)
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(SliceCookieMixin, self).__init__(*args, **kwargs)
+        # Datapath connessi: dpid -> datapath
+        self.datapaths = {}
+        # Statistiche aggregate: slice_stats[dpid][slice_id] = {...}
+        self.slice_stats = {}
+        # Richieste in attesa di risposta: (dpid, xid) -> slice_id
+        self._pending_aggregate = {}
+
+    @set_ev_cls(ofp_event.EventOFPStateChange, [MAIN_DISPATCHER, DEAD_DISPATCHER])
+    def _slice_state_change_handler(self, ev):
+        """Tiene traccia dei datapath connessi"""
+        datapath = ev.datapath
+        if ev.state == MAIN_DISPATCHER:
+            self.datapaths[datapath.id] = datapath
+        elif ev.state == DEAD_DISPATCHER:
+            self.datapaths.pop(datapath.id, None)
+            self.slice_stats.pop(datapath.id, None)
+
+    def _target_datapaths(self, dpid):
+        if dpid is None:
+            return list(self.datapaths.values())
+        if dpid in self.datapaths:
+            return [self.datapaths[dpid]]
+        return []
+
+    def delete_slice_flows(self, slice_id, flow_class=None, dpid=None):
+        """
+        Rimuove con un solo OFPFC_DELETE per switch tutti i flow
+        della slice (ed eventualmente della sola classe indicata)
+        """
+        cookie, mask = cookie_mask(slice_id, flow_class)
+        for datapath in self._target_datapaths(dpid):
+            ofproto = datapath.ofproto
+            parser = datapath.ofproto_parser
+            mod = parser.OFPFlowMod(
+                datapath=datapath,
+                cookie=cookie,
+                cookie_mask=mask,
+                table_id=ofproto.OFPTT_ALL,
+                command=ofproto.OFPFC_DELETE,
+                out_port=ofproto.OFPP_ANY,
+                out_group=ofproto.OFPG_ANY,
+                match=parser.OFPMatch()
+            )
+            datapath.send_msg(mod)
+
+    def modify_slice_flows(self, slice_id, actions_for, flow_class=None,
+                           dpid=None, table_id=0):
+        """
+        Sostituisce con un solo OFPFC_MODIFY per switch le azioni
+        di tutti i flow della slice. actions_for(datapath) restituisce
+        la nuova lista di azioni per lo switch.
+        OpenFlow 1.3 ammette OFPTT_ALL solo per il delete: il modify
+        agisce sulla sola tabella table_id.
+        """
+        cookie, mask = cookie_mask(slice_id, flow_class)
+        for datapath in self._target_datapaths(dpid):
+            ofproto = datapath.ofproto
+            parser = datapath.ofproto_parser
+            inst = [
+                parser.OFPInstructionActions(
+                    ofproto.OFPIT_APPLY_ACTIONS,
+                    actions_for(datapath)
+                )
+            ]
+            mod = parser.OFPFlowMod(
+                datapath=datapath,
+                cookie=cookie,
+                cookie_mask=mask,
+                table_id=table_id,
+                command=ofproto.OFPFC_MODIFY,
+                match=parser.OFPMatch(),
+                instructions=inst
+            )
+            datapath.send_msg(mod)
+
+    def request_slice_stats(self, slice_id, flow_class=None, dpid=None):
+        """
+        Richiede i contatori aggregati (pacchetti, byte, flow) della
+        slice con un solo OFPAggregateStatsRequest per switch.
+        Il risultato arriva in self.slice_stats[dpid][slice_id].
+        """
+        cookie, mask = cookie_mask(slice_id, flow_class)
+        for datapath in self._target_datapaths(dpid):
+            ofproto = datapath.ofproto
+            parser = datapath.ofproto_parser
+            req = parser.OFPAggregateStatsRequest(
+                datapath,
+                0,
+                ofproto.OFPTT_ALL,
+                ofproto.OFPP_ANY,
+                ofproto.OFPG_ANY,
+                cookie,
+                mask,
+                parser.OFPMatch()
+            )
+            datapath.send_msg(req)
+            # send_msg assegna lo xid: serve per associare la risposta
+            self._pending_aggregate[(datapath.id, req.xid)] = slice_id
+
+    @set_ev_cls(ofp_event.EventOFPAggregateStatsReply, MAIN_DISPATCHER)
+    def _aggregate_stats_reply_handler(self, ev):
+        """Salva i contatori aggregati per slice"""
+        msg = ev.msg
+        dpid = msg.datapath.id
+        slice_id = self._pending_aggregate.pop((dpid, msg.xid), None)
+        if slice_id is None:
+            return
+
+        body = msg.body
+        self.slice_stats.setdefault(dpid, {})
+        self.slice_stats[dpid][slice_id] = {
+            "packets": body.packet_count,
+            "bytes": body.byte_count,
+            "flows": body.flow_count,
+        }
+        self.logger.info(
+            "dpid=%s slice=%s packets=%d bytes=%d flows=%d",
+            dpid, slice_id, body.packet_count, body.byte_count, body.flow_count
+        )
@@ -7,7 +7,10 @@ from ryu.lib.packet import packet
 from ryu.lib.packet import ethernet
 from ryu.lib.packet import ether_types
 
-class TopologySlicingMacToPort(app_manager.RyuApp):
+from slice_cookies import SliceCookieMixin, make_cookie, NO_SLICE
+from slice_cookies import FLOW_CLASS_TABLE_MISS, FLOW_CLASS_MAC
+
+class TopologySlicingMacToPort(SliceCookieMixin, app_manager.RyuApp):
     OFP_VERSIONS = [ofproto_v1_3.OFP_VERSION]
 
     def __init__(self, *args, **kwargs):
@@ -29,6 +32,9 @@ class TopologySlicingMacToPort(app_manager.RyuApp):
         # Mappatura switch ammessi
         self.upper_path_switches = {1, 2, 4}
         self.lower_path_switches = {1, 3, 4}
+        # Identificativi delle slice usati nei cookie
+        self.upper_slice = 1
+        self.lower_slice = 2
 
     @set_ev_cls(ofp_event.EventOFPSwitchFeatures, CONFIG_DISPATCHER)
     def switch_features_handler(self, ev):
@@ -38,17 +44,17 @@ class TopologySlicingMacToPort(app_manager.RyuApp):
         match = parser.OFPMatch()
         actions = [parser.OFPActionOutput(ofproto.OFPP_CONTROLLER, ofproto.OFPCML_NO_BUFFER)]
         inst = [parser.OFPInstructionActions(ofproto.OFPIT_APPLY_ACTIONS, actions)]
-        mod = parser.OFPFlowMod(datapath=datapath, priority=0, match=match, instructions=inst)
+        mod = parser.OFPFlowMod(datapath=datapath, cookie=make_cookie(NO_SLICE, FLOW_CLASS_TABLE_MISS), priority=0, match=match, instructions=inst)
         datapath.send_msg(mod)
 
-    def add_flow(self, datapath, priority, match, actions, buffer_id=None):
+    def add_flow(self, datapath, priority, match, actions, buffer_id=None, cookie=0):
         ofproto = datapath.ofproto
         parser = datapath.ofproto_parser
         inst = [parser.OFPInstructionActions(ofproto.OFPIT_APPLY_ACTIONS, actions)]
         if buffer_id:
-            mod = parser.OFPFlowMod(datapath=datapath, buffer_id=buffer_id, priority=priority, match=match, instructions=inst)
+            mod = parser.OFPFlowMod(datapath=datapath, cookie=cookie, buffer_id=buffer_id, priority=priority, match=match, instructions=inst)
         else:
-            mod = parser.OFPFlowMod(datapath=datapath, priority=priority, match=match, instructions=inst)
+            mod = parser.OFPFlowMod(datapath=datapath, cookie=cookie, priority=priority, match=match, instructions=inst)
         datapath.send_msg(mod)
 
     @set_ev_cls(ofp_event.EventOFPPacketIn, MAIN_DISPATCHER)
@@ -76,9 +82,11 @@ class TopologySlicingMacToPort(app_manager.RyuApp):
         if (src == self.mac_h1 and dst == self.mac_h3) or (src == self.mac_h3 and dst == self.mac_h1):
             if dpid not in self.upper_path_switches:
                 return
+            slice_id = self.upper_slice
         elif (src == self.mac_h2 and dst == self.mac_h4) or (src == self.mac_h4 and dst == self.mac_h2):
             if dpid not in self.lower_path_switches:
                 return
+            slice_id = self.lower_slice
 
         if dst in self.mac_to_port[dpid]:
             out_port = self.mac_to_port[dpid][dst]
@@ -87,7 +95,7 @@ class TopologySlicingMacToPort(app_manager.RyuApp):
 
         actions = [parser.OFPActionOutput(out_port)]
         match = parser.OFPMatch(in_port=in_port, eth_src=src, eth_dst=dst)
-        self.add_flow(datapath, 1, match, actions)
+        self.add_flow(datapath, 1, match, actions, cookie=make_cookie(slice_id, FLOW_CLASS_MAC))
         
         out = parser.OFPPacketOut(datapath=datapath, buffer_id=msg.buffer_id, in_port=in_port, actions=actions, data=msg.data if msg.buffer_id == datapath.ofproto.OFP_NO_BUFFER else None)
         datapath.send_msg(out)
\ No newline at end of file
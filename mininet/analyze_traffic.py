@@ -0,0 +1,275 @@
+"""
+Analisi offline dei dati raccolti dal monitor.
+
+Legge i CSV di monitor_network.py a blocchi (memoria limitata anche per
+catture di giorni) e aggrega con NumPy le metriche per slice: banda,
+perdita, latenza, jitter e intervalli di violazione SLA. I log di
+capacity_test.py producono invece i punti di ginocchio del test di carico.
+Più file vengono analizzati in parallelo su più core.
+
+Uso:
+    python3 analyze_traffic.py traffic_data.csv capacity_test_results.log
+    python3 analyze_traffic.py run1.csv run2.csv --jobs 4 --output report.json
+"""
+import argparse
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+CHUNK_ROWS = 200000
+SECONDS_PER_DAY = 86400
+COLUMNS = ["Timestamp", "Interface", "Mbps", "Latency", "Jitter", "Loss"]
+
+# Bordi dell'istogramma di latenza (ms): fissi, quindi memoria costante.
+# L'ultimo bin raccoglie le latenze oltre 10 s.
+LATENCY_EDGES = np.concatenate(([0.0], np.logspace(-3, 4, 141), [np.inf]))
+
+# Periodo di campionamento del monitor (s): un campione in violazione
+# conta almeno per questo intervallo
+DEFAULT_SAMPLE_PERIOD = 1.0
+
+# Soglie SLA di default (la soglia di loss è quella di capacity_test.py)
+DEFAULT_MAX_LOSS = 10.0
+DEFAULT_MAX_LATENCY = 100.0
+
+# Righe del log di capacity_test.py
+LOAD_RE = re.compile(r"Carico:\s*([\d.]+)\s*Mbps")
+LOSS_RE = re.compile(r"Loss recente rilevato:\s*([\d.]+)%")
+
+
+def format_time(abs_seconds):
+    """Secondi assoluti -> 'HH:MM:SS', con il giorno se la cattura supera la mezzanotte"""
+    day, secs = divmod(int(abs_seconds), SECONDS_PER_DAY)
+    hms = "%02d:%02d:%02d" % (secs // 3600, secs % 3600 // 60, secs % 60)
+    return f"+{day}d {hms}" if day else hms
+
+
+class SliceAccumulator:
+    """Aggregati incrementali di una slice, aggiornati blocco per blocco"""
+
+    def __init__(self, sample_period=DEFAULT_SAMPLE_PERIOD):
+        self.sample_period = sample_period
+        self.samples = 0
+        self.mbps_sum = 0.0
+        self.mbps_max = 0.0
+        self.loss_sum = 0.0
+        self.loss_max = 0.0
+        self.jitter_sum = 0.0
+        self.latency_count = 0
+        self.latency_sum = 0.0
+        self.latency_min = np.inf
+        self.latency_max = 0.0
+        self.latency_hist = np.zeros(len(LATENCY_EDGES) - 1, dtype=np.int64)
+
+        # Ricostruzione del tempo assoluto (il CSV contiene solo HH:MM:SS)
+        self.day_offset = 0
+        self.last_sec = None
+        self.last_abs = None
+
+        # Intervalli di violazione SLA
+        self.open_start = None
+        self.intervals = []
+
+    def _absolute_times(self, secs):
+        prev = secs[0] if self.last_sec is None else self.last_sec
+        wraps = np.cumsum(np.diff(secs, prepend=prev) < 0)
+        abs_secs = secs + (self.day_offset + wraps) * SECONDS_PER_DAY
+        self.day_offset += int(wraps[-1])
+        self.last_sec = secs[-1]
+        return abs_secs
+
+    def _update_intervals(self, abs_secs, violated):
+        prev = 1 if self.open_start is not None else 0
+        edges = np.diff(violated.astype(np.int8), prepend=prev)
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+
+        # Un intervallo aperto nel blocco precedente si chiude al primo fronte di discesa
+        if self.open_start is not None and len(ends):
+            end_abs = self.last_abs if ends[0] == 0 else abs_secs[ends[0] - 1]
+            self.intervals.append((self.open_start, end_abs))
+            self.open_start = None
+            ends = ends[1:]
+
+        for i, start in enumerate(starts):
+            if i < len(ends):
+                self.intervals.append((abs_secs[start], abs_secs[ends[i] - 1]))
+            else:
+                self.open_start = abs_secs[start]
+
+        self.last_abs = abs_secs[-1]
+
+    def update(self, secs, mbps, latency, jitter, loss, max_loss, max_latency):
+        self.samples += len(secs)
+        self.mbps_sum += mbps.sum()
+        self.mbps_max = max(self.mbps_max, mbps.max())
+        self.loss_sum += loss.sum()
+        self.loss_max = max(self.loss_max, loss.max())
+        self.jitter_sum += jitter.sum()
+
+        # Come nella dashboard: latenza valida solo se il link è attivo
+        alive = loss < 100
+        lat = latency[alive]
+        if len(lat):
+            self.latency_count += len(lat)
+            self.latency_sum += lat.sum()
+            self.latency_min = min(self.latency_min, lat.min())
+            self.latency_max = max(self.latency_max, lat.max())
+            self.latency_hist += np.histogram(lat, bins=LATENCY_EDGES)[0]
+
+        violated = (loss > max_loss) | (alive & (latency > max_latency))
+        self._update_intervals(self._absolute_times(secs), violated)
+
+    def _latency_percentile(self, q):
+        if not self.latency_count:
+            return 0.0
+        cdf = np.cumsum(self.latency_hist)
+        idx = int(np.searchsorted(cdf, q * self.latency_count))
+        idx = min(idx, len(self.latency_hist) - 1)
+        # Limite superiore del bin, senza superare il massimo osservato
+        return float(min(LATENCY_EDGES[idx + 1], self.latency_max))
+
+    def summary(self):
+        intervals = list(self.intervals)
+        if self.open_start is not None:
+            intervals.append((self.open_start, self.last_abs))
+        # Ogni intervallo copre anche il periodo dell'ultimo campione
+        durations = [end - start + self.sample_period for start, end in intervals]
+
+        n = self.samples
+        return {
+            "samples": n,
+            "mbps_avg": round(self.mbps_sum / n, 3),
+            "mbps_max": round(float(self.mbps_max), 3),
+            "loss_avg": round(self.loss_sum / n, 3),
+            "loss_max": round(float(self.loss_max), 3),
+            "jitter_avg": round(self.jitter_sum / n, 3),
+            "latency_avg": round(self.latency_sum / self.latency_count, 3) if self.latency_count else 0.0,
+            "latency_min": round(float(self.latency_min), 3) if self.latency_count else 0.0,
+            "latency_max": round(float(self.latency_max), 3),
+            "latency_p50": round(self._latency_percentile(0.50), 3),
+            "latency_p95": round(self._latency_percentile(0.95), 3),
+            "sla_violation_seconds": round(sum(durations), 3),
+            "sla_intervals": [
+                {"start": format_time(start), "end": format_time(end), "seconds": round(seconds, 3)}
+                for (start, end), seconds in zip(intervals, durations)
+            ],
+        }
+
+
+def analyze_csv(path, max_loss, max_latency, chunk_rows=CHUNK_ROWS,
+                sample_period=DEFAULT_SAMPLE_PERIOD):
+    """Aggrega un CSV del monitor leggendolo a blocchi di 'chunk_rows' righe"""
+    slices = {}
+    reader = pd.read_csv(
+        path,
+        usecols=COLUMNS,
+        dtype={"Timestamp": str, "Interface": str},
+        chunksize=chunk_rows,
+        on_bad_lines="skip",
+    )
+    for chunk in reader:
+        secs = pd.to_timedelta(chunk["Timestamp"], errors="coerce").dt.total_seconds()
+        values = chunk[["Mbps", "Latency", "Jitter", "Loss"]].apply(pd.to_numeric, errors="coerce")
+        valid = secs.notna() & values.notna().all(axis=1) & chunk["Interface"].notna()
+        if not valid.any():
+            continue
+
+        labels = chunk["Interface"].to_numpy()[valid.to_numpy()]
+        secs = secs.to_numpy()[valid.to_numpy()]
+        values = values.to_numpy(dtype=np.float64)[valid.to_numpy()]
+
+        for label in pd.unique(labels):
+            rows = labels == label
+            v = values[rows]
+            slices.setdefault(label, SliceAccumulator(sample_period)).update(
+                secs[rows], v[:, 0], v[:, 1], v[:, 2], v[:, 3], max_loss, max_latency
+            )
+
+    return {
+        "file": path,
+        "type": "traffic",
+        "slices": {label: acc.summary() for label, acc in slices.items()},
+    }
+
+
+def analyze_capacity_log(path, max_loss):
+    """Estrae la curva carico/perdita di capacity_test.py e il punto di ginocchio"""
+    points = []
+    load = None
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            m = LOAD_RE.search(line)
+            if m:
+                load = float(m.group(1))
+                continue
+            m = LOSS_RE.search(line)
+            if m and load is not None:
+                points.append((load, float(m.group(1))))
+                load = None
+
+    first_loss = next((l for l, loss in points if loss > 0), None)
+    collapse = next((l for l, loss in points if loss > max_loss), None)
+    stable = [l for l, loss in points if loss <= max_loss and (collapse is None or l < collapse)]
+
+    return {
+        "file": path,
+        "type": "capacity",
+        "loss_threshold": max_loss,
+        "points": [{"load_mbps": l, "loss": loss} for l, loss in points],
+        "first_loss_mbps": first_loss,
+        "knee_mbps": max(stable) if stable else None,
+        "collapse_mbps": collapse,
+    }
+
+
+def analyze_file(path, max_loss=DEFAULT_MAX_LOSS, max_latency=DEFAULT_MAX_LATENCY,
+                 chunk_rows=CHUNK_ROWS, sample_period=DEFAULT_SAMPLE_PERIOD):
+    if path.endswith(".log"):
+        return analyze_capacity_log(path, max_loss)
+    return analyze_csv(path, max_loss, max_latency, chunk_rows, sample_period)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Analisi offline dei dati di traffico")
+    parser.add_argument("files", nargs="+", help="CSV del monitor e/o log di capacity_test.py")
+    parser.add_argument("--max-loss", type=float, default=DEFAULT_MAX_LOSS, help="soglia SLA di perdita (%%)")
+    parser.add_argument("--max-latency", type=float, default=DEFAULT_MAX_LATENCY, help="soglia SLA di latenza (ms)")
+    parser.add_argument("--sample-period", type=float, default=DEFAULT_SAMPLE_PERIOD, help="periodo di campionamento del monitor (s)")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="righe per blocco di lettura")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="processi paralleli")
+    parser.add_argument("--output", help="file JSON del report (default: stdout)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    missing = [p for p in args.files if not os.path.exists(p)]
+    if missing:
+        print(f"Errore: file non trovati: {', '.join(missing)}", file=sys.stderr)
+        return 1
+
+    n = len(args.files)
+    params = ([args.max_loss] * n, [args.max_latency] * n, [args.chunk_rows] * n,
+              [args.sample_period] * n)
+    if n > 1 and args.jobs > 1:
+        with ProcessPoolExecutor(max_workers=min(args.jobs, n)) as pool:
+            results = list(pool.map(analyze_file, args.files, *params))
+    else:
+        results = list(map(analyze_file, args.files, *params))
+
+    output = json.dumps({"results": results}, indent=2)
+    if args.output:
+        with open(args.output, "w") as f: f.write(output + "\n")
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,830 @@
+"""
+Emulatore a eventi discreti della rete di slicing, senza root né Mininet/OVS.
+
+La topologia è quella di NetworkSlicingTopo (switch, link, porte e 'bw').
+Gli switch modellano la pipeline OpenFlow 1.3 (tabelle, priorità, metadata,
+GotoTable), i link hanno coda drop-tail, banda e ritardo di propagazione.
+I controller reali (ServiceSlicing / TopologySlicingMacToPort) ricevono gli
+eventi Ryu da datapath finti, quindi flow mod, packet-out e statistiche
+passano dallo stesso codice usato con OVS.
+
+Il monitor emulato produce lo stesso CSV di monitor_network.py; le
+statistiche per flow usano lo stesso schema di traffic_gen.py.
+I flow TCP sono modellati a livello di pacchetto, senza controllo di congestione.
+
+Uso:
+    python3 emulator.py --controller service --flows 2000 --duration 30
+    python3 emulator.py --controller service --multi-table --output traffic_data.csv
+    python3 emulator.py --controller topology --results results.json
+"""
+import argparse
+import csv
+import heapq
+import importlib
+import itertools
+import json
+import os
+import random
+import sys
+import time
+from collections import deque
+
+from ryu.controller import ofp_event
+from ryu.controller.handler import CONFIG_DISPATCHER, MAIN_DISPATCHER
+from ryu.ofproto import ofproto_v1_3
+from ryu.ofproto import ofproto_v1_3_parser
+from ryu.lib.packet import packet
+from ryu.lib.packet import ethernet
+from ryu.lib.packet import ether_types
+from ryu.lib.packet import ipv4
+from ryu.lib.packet import udp
+from ryu.lib.packet import tcp
+from ryu.lib.packet import icmp
+
+from network_topology import NetworkSlicingTopo
+from monitor_network import INTERFACES
+from traffic_gen import FlowStats, HEADER, PATTERNS, next_gap, is_on
+
+CONTROLLERS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "controllers")
+
+# Controller disponibili: nome -> (modulo, classe)
+CONTROLLERS = {
+    "service": ("service_slicing", "ServiceSlicing"),
+    "topology": ("topology_slicing", "TopologySlicingMacToPort"),
+}
+
+CSV_HEADER = ["Timestamp", "Interface", "Mbps", "Latency", "Jitter", "Loss"]
+
+# Parametri di default del modello
+DEFAULT_LINK_DELAY = 0.00005    # ritardo di propagazione (s)
+DEFAULT_MAX_QUEUE = 1000        # pacchetti, come txqueuelen in Mininet
+DEFAULT_CONTROLLER_DELAY = 0.001  # latenza switch <-> controller (s)
+N_BUFFERS = 256                 # pacchetti bufferizzati in attesa del controller
+
+# Ping del monitor emulato (come in monitor_network.py: ping -c 3 -i 0.2 -W 1)
+PING_COUNT = 3
+PING_INTERVAL = 0.2
+PING_TIMEOUT = 1.0
+PING_SIZE = 98
+
+# Coppie sorgente/destinazione e tipi di traffico generati
+FLOW_PAIRS = [("h1", "h3"), ("h2", "h4"), ("h3", "h1"), ("h4", "h2")]
+FLOW_KINDS = ("video", "udp", "tcp")
+VIDEO_PORT = 9999
+# Porte L4 dei flow: intervalli che ryu.lib.packet non interpreta come
+# protocolli applicativi (VXLAN 4789, Geneve 6081, OpenFlow 6633/6653, ...)
+BASE_PORT = 10000
+SRC_BASE_PORT = 40000
+PORT_RANGE = 20000
+
+BROADCAST = "ff:ff:ff:ff:ff:ff"
+
+
+def ping_summary(rtts, count=PING_COUNT):
+    """Come ping: media e mdev degli RTT (ms), perdita in percentuale"""
+    if not rtts:
+        return 0, 0, 100
+    avg = sum(rtts) / len(rtts)
+    # Con RTT uguali l'arrotondamento può rendere la varianza appena negativa
+    variance = max(0.0, sum(r * r for r in rtts) / len(rtts) - avg * avg)
+    loss = round(100.0 * (count - len(rtts)) / count, 3)
+    return round(avg, 3), round(variance ** 0.5, 3), loss
+
+
+class Simulator:
+    """Coda di eventi a tempo simulato"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.events = 0
+        self._queue = []
+        self._seq = itertools.count()
+
+    def schedule(self, delay, callback, *args):
+        heapq.heappush(self._queue, (self.now + delay, next(self._seq), callback, args))
+
+    def run(self, until):
+        queue = self._queue
+        while queue and queue[0][0] <= until:
+            self.now, _, callback, args = heapq.heappop(queue)
+            self.events += 1
+            callback(*args)
+        self.now = until
+
+
+class Packet:
+    """Pacchetto simulato: campi di header usati per il matching OpenFlow"""
+    __slots__ = ("fields", "size", "flow_id", "seq", "sent")
+
+    def __init__(self, fields, size, flow_id=None, seq=0, sent=0.0):
+        self.fields = fields
+        self.size = size
+        self.flow_id = flow_id
+        self.seq = seq
+        self.sent = sent
+
+    def _payload(self):
+        """Header di traffic_gen.py nel payload: flow, seq, dimensione e invio"""
+        if self.flow_id is None:
+            return b""
+        return HEADER.pack(self.flow_id, self.seq, self.size, int(self.sent * 1e9))
+
+    def to_bytes(self):
+        """Serializza il pacchetto con ryu.lib.packet (per i packet-in)"""
+        f = self.fields
+        payload = self._payload()
+        pkt = packet.Packet()
+        pkt.add_protocol(ethernet.ethernet(
+            dst=f["eth_dst"], src=f["eth_src"], ethertype=f["eth_type"]
+        ))
+        if f["eth_type"] == ether_types.ETH_TYPE_IP:
+            pkt.add_protocol(ipv4.ipv4(
+                src=f["ipv4_src"], dst=f["ipv4_dst"], proto=f["ip_proto"]
+            ))
+            if f["ip_proto"] == 0x11:
+                pkt.add_protocol(udp.udp(src_port=f["udp_src"], dst_port=f["udp_dst"]))
+                pkt.add_protocol(payload)
+            elif f["ip_proto"] == 0x06:
+                pkt.add_protocol(tcp.tcp(src_port=f["tcp_src"], dst_port=f["tcp_dst"]))
+                pkt.add_protocol(payload)
+            elif f["ip_proto"] == 0x01:
+                pkt.add_protocol(icmp.icmp(
+                    type_=f["icmpv4_type"], code=0, csum=0,
+                    data=icmp.echo(id_=f["icmp_id"], seq=f["icmp_seq"], data=payload)
+                ))
+        pkt.serialize()
+        return bytes(pkt.data)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Ricostruisce campi e identità del flow da un packet-out senza buffer"""
+        pkt = packet.Packet(data)
+        eth = pkt.get_protocol(ethernet.ethernet)
+        fields = {"eth_src": eth.src, "eth_dst": eth.dst, "eth_type": eth.ethertype}
+        payload = pkt.protocols[-1] if isinstance(pkt.protocols[-1], (bytes, bytearray)) else b""
+        ip = pkt.get_protocol(ipv4.ipv4)
+        if ip:
+            fields.update(ipv4_src=ip.src, ipv4_dst=ip.dst, ip_proto=ip.proto)
+            for proto, name in ((udp.udp, "udp"), (tcp.tcp, "tcp")):
+                l4 = pkt.get_protocol(proto)
+                if l4:
+                    fields[name + "_src"] = l4.src_port
+                    fields[name + "_dst"] = l4.dst_port
+            ic = pkt.get_protocol(icmp.icmp)
+            if ic:
+                fields.update(icmpv4_type=ic.type, icmp_id=ic.data.id, icmp_seq=ic.data.seq)
+                payload = ic.data.data or b""
+        if len(payload) >= HEADER.size:
+            flow_id, seq, size, sent_ns = HEADER.unpack_from(payload)
+            return cls(fields, size, flow_id, seq, sent_ns / 1e9)
+        return cls(fields, len(data))
+
+
+class Link:
+    """Direzione di un link: coda drop-tail, banda e ritardo di propagazione"""
+
+    def __init__(self, sim, node, port, bw, delay, max_queue):
+        self.sim = sim
+        self.node = node
+        self.port = port
+        self.bps = bw * 1e6 if bw else None
+        self.delay = delay
+        self.max_queue = max_queue
+        self.busy_until = 0.0
+        # Pacchetti in coda o in trasmissione: (fine trasmissione, byte)
+        self.backlog = deque()
+        self.tx_bytes = 0
+        self.tx_packets = 0
+        self.dropped = 0
+
+    def _drain(self, now):
+        backlog = self.backlog
+        while backlog and backlog[0][0] <= now:
+            self.tx_bytes += backlog.popleft()[1]
+            self.tx_packets += 1
+
+    def get_tx_bytes(self):
+        """Byte trasmessi fino all'istante corrente (come /sys/class/net/*/tx_bytes)"""
+        self._drain(self.sim.now)
+        return self.tx_bytes
+
+    def send(self, pkt):
+        now = self.sim.now
+        if self.bps is None:
+            # Link senza limite di banda (host_link_config)
+            self.tx_bytes += pkt.size
+            self.tx_packets += 1
+            self.sim.schedule(self.delay, self.node.receive, pkt, self.port)
+            return
+
+        self._drain(now)
+        if len(self.backlog) >= self.max_queue:
+            self.dropped += 1
+            return
+        self.busy_until = max(now, self.busy_until) + pkt.size * 8 / self.bps
+        self.backlog.append((self.busy_until, pkt.size))
+        self.sim.schedule(self.busy_until - now + self.delay, self.node.receive, pkt, self.port)
+
+
+class FlowEntry:
+    """Flow entry di una tabella OpenFlow"""
+    __slots__ = ("priority", "match", "instructions", "cookie", "packets", "bytes")
+
+    def __init__(self, priority, match, instructions, cookie):
+        self.priority = priority
+        self.match = match
+        self.instructions = instructions
+        self.cookie = cookie
+        self.packets = 0
+        self.bytes = 0
+
+    def matches(self, fields):
+        for name, value, mask in self.match:
+            v = fields.get(name)
+            if v is None:
+                return False
+            if mask is None or not isinstance(v, int):
+                if v != value:
+                    return False
+            elif (v & mask) != (value & mask):
+                return False
+        return True
+
+    def outputs_to(self, port):
+        for inst in self.instructions:
+            for action in getattr(inst, "actions", []):
+                if getattr(action, "port", None) == port:
+                    return True
+        return False
+
+
+def match_fields(match):
+    """OFPMatch -> tupla di (campo, valore, maschera)"""
+    fields = []
+    for name, value in match.items():
+        if isinstance(value, tuple):
+            fields.append((name, value[0], value[1]))
+        else:
+            fields.append((name, value, None))
+    return tuple(sorted(fields, key=lambda f: f[0]))
+
+
+class Switch:
+    """Switch OpenFlow 1.3: tabelle di flow, pipeline e buffer dei packet-in"""
+
+    def __init__(self, emulator, name, dpid):
+        self.emulator = emulator
+        self.name = name
+        self.dpid = dpid
+        self.ports = {}
+        self.tables = {}
+        self.lookups = {}
+        self.matched = {}
+        self.buffers = {}
+        self.buffer_drops = 0
+        self._buffer_ids = itertools.count(1)
+        self.datapath = FakeDatapath(self)
+
+    # --- Data plane ---
+
+    def _lookup(self, table_id, fields):
+        self.lookups[table_id] = self.lookups.get(table_id, 0) + 1
+        for entry in self.tables.get(table_id, ()):
+            if entry.matches(fields):
+                self.matched[table_id] = self.matched.get(table_id, 0) + 1
+                return entry
+        return None
+
+    def receive(self, pkt, in_port):
+        fields = dict(pkt.fields, in_port=in_port, metadata=0)
+        table_id = 0
+        while True:
+            entry = self._lookup(table_id, fields)
+            if entry is None:
+                # Nessuna table-miss entry: il pacchetto viene scartato
+                return
+            entry.packets += 1
+            entry.bytes += pkt.size
+
+            goto = None
+            for inst in entry.instructions:
+                if isinstance(inst, ofproto_v1_3_parser.OFPInstructionActions):
+                    self._apply_actions(pkt, inst.actions, in_port, table_id, entry.cookie)
+                elif isinstance(inst, ofproto_v1_3_parser.OFPInstructionWriteMetadata):
+                    mask = inst.metadata_mask
+                    fields["metadata"] = (fields["metadata"] & ~mask) | (inst.metadata & mask)
+                elif isinstance(inst, ofproto_v1_3_parser.OFPInstructionGotoTable):
+                    goto = inst.table_id
+            if goto is None:
+                return
+            table_id = goto
+
+    def _apply_actions(self, pkt, actions, in_port, table_id=0, cookie=0):
+        ofproto = ofproto_v1_3
+        for action in actions:
+            if not isinstance(action, ofproto_v1_3_parser.OFPActionOutput):
+                continue
+            port = action.port
+            if port == ofproto.OFPP_CONTROLLER:
+                self.emulator.packet_in(self, pkt, in_port, table_id, cookie, action.max_len)
+            elif port in (ofproto.OFPP_FLOOD, ofproto.OFPP_ALL):
+                for out_port, link in self.ports.items():
+                    if out_port != in_port:
+                        link.send(pkt)
+            elif port == ofproto.OFPP_IN_PORT:
+                self.ports[in_port].send(pkt)
+            elif port in self.ports and port != in_port:
+                self.ports[port].send(pkt)
+
+    def buffer(self, pkt, in_port):
+        # Buffer pieno: si scarta il pacchetto più vecchio, come OVS
+        if len(self.buffers) >= N_BUFFERS:
+            del self.buffers[next(iter(self.buffers))]
+            self.buffer_drops += 1
+        buffer_id = next(self._buffer_ids)
+        self.buffers[buffer_id] = (pkt, in_port)
+        return buffer_id
+
+    # --- Control plane ---
+
+    def _select(self, msg, strict):
+        """Entry selezionate da un flow mod o da una richiesta di statistiche"""
+        ofproto = ofproto_v1_3
+        table_ids = list(self.tables) if msg.table_id == ofproto.OFPTT_ALL else [msg.table_id]
+        req_match = match_fields(msg.match) if msg.match is not None else ()
+        out_port = getattr(msg, "out_port", ofproto.OFPP_ANY)
+
+        selected = []
+        for table_id in table_ids:
+            for entry in self.tables.get(table_id, ()):
+                if (entry.cookie & msg.cookie_mask) != (msg.cookie & msg.cookie_mask):
+                    continue
+                if strict:
+                    if entry.priority != msg.priority or entry.match != req_match:
+                        continue
+                elif not set(req_match) <= set(entry.match):
+                    continue
+                if out_port not in (ofproto.OFPP_ANY, 0) and not entry.outputs_to(out_port):
+                    continue
+                selected.append((table_id, entry))
+        return selected
+
+    def flow_mod(self, msg):
+        ofproto = ofproto_v1_3
+        command = msg.command
+
+        if command == ofproto.OFPFC_ADD:
+            table = self.tables.setdefault(msg.table_id, [])
+            match = match_fields(msg.match)
+            # Un'entry identica (stessa priorità e match) viene sostituita
+            table[:] = [e for e in table if not (e.priority == msg.priority and e.match == match)]
+            table.append(FlowEntry(msg.priority, match, msg.instructions, msg.cookie))
+            table.sort(key=lambda e: -e.priority)
+            if msg.buffer_id != ofproto.OFP_NO_BUFFER and msg.buffer_id in self.buffers:
+                pkt, in_port = self.buffers.pop(msg.buffer_id)
+                self.receive(pkt, in_port)
+
+        elif command in (ofproto.OFPFC_MODIFY, ofproto.OFPFC_MODIFY_STRICT):
+            strict = command == ofproto.OFPFC_MODIFY_STRICT
+            for _, entry in self._select(msg, strict):
+                entry.instructions = msg.instructions
+
+        elif command in (ofproto.OFPFC_DELETE, ofproto.OFPFC_DELETE_STRICT):
+            strict = command == ofproto.OFPFC_DELETE_STRICT
+            for table_id, entry in self._select(msg, strict):
+                self.tables[table_id].remove(entry)
+
+    def packet_out(self, msg):
+        if msg.buffer_id != ofproto_v1_3.OFP_NO_BUFFER:
+            if msg.buffer_id not in self.buffers:
+                return
+            pkt, _ = self.buffers.pop(msg.buffer_id)
+        else:
+            pkt = Packet.from_bytes(msg.data)
+        self._apply_actions(pkt, msg.actions, msg.in_port)
+
+    def aggregate_stats(self, msg):
+        selected = self._select(msg, strict=False)
+        return ofproto_v1_3_parser.OFPAggregateStats(
+            packet_count=sum(e.packets for _, e in selected),
+            byte_count=sum(e.bytes for _, e in selected),
+            flow_count=len(selected),
+        )
+
+    def table_stats(self):
+        return [
+            ofproto_v1_3_parser.OFPTableStats(
+                table_id=table_id,
+                active_count=len(self.tables.get(table_id, ())),
+                lookup_count=self.lookups.get(table_id, 0),
+                matched_count=self.matched.get(table_id, 0),
+            )
+            for table_id in sorted(set(self.tables) | set(self.lookups))
+        ]
+
+    def occupancy(self):
+        return {str(t): len(entries) for t, entries in sorted(self.tables.items()) if entries}
+
+
+class FakeDatapath:
+    """Datapath Ryu finto: i messaggi del controller vanno allo switch emulato"""
+
+    def __init__(self, switch):
+        self.switch = switch
+        self.id = switch.dpid
+        self.ofproto = ofproto_v1_3
+        self.ofproto_parser = ofproto_v1_3_parser
+        self.xid = 0
+
+    def set_xid(self, msg):
+        self.xid = (self.xid + 1) & self.ofproto.MAX_XID
+        msg.set_xid(self.xid)
+        return self.xid
+
+    def send_msg(self, msg):
+        assert isinstance(msg, self.ofproto_parser.MsgBase)
+        if msg.xid is None:
+            self.set_xid(msg)
+        # La serializzazione valida il messaggio come farebbe Ryu con OVS
+        msg.serialize()
+
+        parser = self.ofproto_parser
+        switch = self.switch
+        emulator = switch.emulator
+        if isinstance(msg, parser.OFPFlowMod):
+            switch.flow_mod(msg)
+        elif isinstance(msg, parser.OFPPacketOut):
+            switch.packet_out(msg)
+        elif isinstance(msg, parser.OFPAggregateStatsRequest):
+            reply = parser.OFPAggregateStatsReply(self, body=switch.aggregate_stats(msg))
+            emulator.reply(self, msg, reply, ofp_event.EventOFPAggregateStatsReply)
+        elif isinstance(msg, parser.OFPTableStatsRequest):
+            reply = parser.OFPTableStatsReply(self, body=switch.table_stats())
+            emulator.reply(self, msg, reply, ofp_event.EventOFPTableStatsReply)
+        elif isinstance(msg, parser.OFPBarrierRequest):
+            reply = parser.OFPBarrierReply(self)
+            emulator.reply(self, msg, reply, ofp_event.EventOFPBarrierReply)
+
+
+class Host:
+    """Host con una sola interfaccia: risponde ai ping e registra i flow ricevuti"""
+
+    def __init__(self, emulator, name, mac, ip):
+        self.emulator = emulator
+        self.name = name
+        self.mac = mac
+        self.ip = ip
+        self.link = None
+
+    def send(self, pkt):
+        self.link.send(pkt)
+
+    def receive(self, pkt, port):
+        fields = pkt.fields
+        if fields["eth_dst"] not in (self.mac, BROADCAST):
+            return
+        if fields.get("ipv4_dst") != self.ip:
+            return
+        if fields.get("icmpv4_type") == icmp.ICMP_ECHO_REQUEST:
+            reply = dict(
+                fields,
+                eth_src=self.mac, eth_dst=fields["eth_src"],
+                ipv4_src=self.ip, ipv4_dst=fields["ipv4_src"],
+                icmpv4_type=icmp.ICMP_ECHO_REPLY,
+            )
+            self.send(Packet(reply, pkt.size, pkt.flow_id, pkt.seq, pkt.sent))
+        else:
+            self.emulator.deliver(self, pkt)
+
+
+class Emulator:
+    """Topologia emulata collegata all'applicazione Ryu"""
+
+    def __init__(self, controller="service", multi_table=False,
+                 link_delay=DEFAULT_LINK_DELAY, max_queue=DEFAULT_MAX_QUEUE,
+                 controller_delay=DEFAULT_CONTROLLER_DELAY, seed=0):
+        self.sim = Simulator()
+        self.random = random.Random(seed)
+        self.controller_delay = controller_delay
+        self.switches = {}
+        self.hosts = {}
+        self.links = {}
+        self.flows = {}
+        self.flow_stats = {}
+        self.ping_replies = {}
+        self.packet_ins = 0
+
+        self.app = self._load_app(controller, multi_table)
+        self.handlers = self._collect_handlers(self.app)
+        self._build(NetworkSlicingTopo(), link_delay, max_queue)
+
+    # --- Setup ---
+
+    @staticmethod
+    def _load_app(controller, multi_table):
+        if CONTROLLERS_DIR not in sys.path:
+            sys.path.insert(0, CONTROLLERS_DIR)
+        module_name, class_name = CONTROLLERS[controller]
+        app = getattr(importlib.import_module(module_name), class_name)()
+        if multi_table:
+            if not hasattr(app, "multi_table"):
+                raise ValueError(f"Il controller '{controller}' non supporta la modalità multi-table")
+            app.multi_table = True
+        return app
+
+    @staticmethod
+    def _collect_handlers(app):
+        """Handler @set_ev_cls dell'app: ev_cls -> [(metodo, dispatcher)]"""
+        handlers = {}
+        for name in dir(app):
+            method = getattr(app, name, None)
+            for ev_cls, caller in getattr(method, "callers", {}).items():
+                handlers.setdefault(ev_cls, []).append((method, caller.dispatchers))
+        return handlers
+
+    def _build(self, topo, link_delay, max_queue):
+        for i, name in enumerate(topo.hosts(sort=True)):
+            mac = topo.nodeInfo(name)["mac"]
+            self.hosts[name] = Host(self, name, mac, "10.0.0.%d" % (i + 1))
+        for name in topo.switches(sort=True):
+            dpid = int(topo.nodeInfo(name)["dpid"], 16)
+            self.switches[name] = Switch(self, name, dpid)
+
+        for src, dst, info in topo.links(sort=True, withInfo=True):
+            bw = info.get("bw")
+            for a, pa, b, pb in ((src, info["port1"], dst, info["port2"]),
+                                 (dst, info["port2"], src, info["port1"])):
+                node = self.switches.get(b) or self.hosts[b]
+                link = Link(self.sim, node, pb, bw, link_delay, max_queue)
+                self.links[(a, pa)] = link
+                if a in self.switches:
+                    self.switches[a].ports[pa] = link
+                else:
+                    self.hosts[a].link = link
+
+    def dispatch(self, ev, state):
+        for method, dispatchers in self.handlers.get(type(ev), ()):
+            if not dispatchers or state in dispatchers:
+                method(ev)
+
+    def connect(self):
+        """Handshake OpenFlow: switch features e passaggio a MAIN_DISPATCHER"""
+        parser = ofproto_v1_3_parser
+        for switch in self.switches.values():
+            dp = switch.datapath
+            features = parser.OFPSwitchFeatures(dp, datapath_id=dp.id, n_buffers=256, n_tables=254)
+            self.dispatch(ofp_event.EventOFPSwitchFeatures(features), CONFIG_DISPATCHER)
+            ev = ofp_event.EventOFPStateChange(dp)
+            ev.state = MAIN_DISPATCHER
+            self.dispatch(ev, MAIN_DISPATCHER)
+
+    # --- Controller ---
+
+    def _deliver(self, ev_cls, msg):
+        self.dispatch(ev_cls(msg), MAIN_DISPATCHER)
+
+    def reply(self, datapath, request, reply, ev_cls):
+        """Le risposte arrivano al controller dopo la latenza di controllo"""
+        reply.xid = request.xid
+        self.sim.schedule(self.controller_delay, self._deliver, ev_cls, reply)
+
+    def packet_in(self, switch, pkt, in_port, table_id, cookie, max_len):
+        self.packet_ins += 1
+        ofproto = ofproto_v1_3
+        data = pkt.to_bytes()
+        # Con OFPCML_NO_BUFFER il pacchetto intero va al controller senza buffer
+        if max_len == ofproto.OFPCML_NO_BUFFER:
+            buffer_id = ofproto.OFP_NO_BUFFER
+        else:
+            buffer_id = switch.buffer(pkt, in_port)
+        msg = ofproto_v1_3_parser.OFPPacketIn(
+            switch.datapath,
+            buffer_id=buffer_id,
+            total_len=len(data),
+            reason=ofproto.OFPR_NO_MATCH,
+            table_id=table_id,
+            cookie=cookie,
+            match=ofproto_v1_3_parser.OFPMatch(in_port=in_port),
+            data=data,
+        )
+        self.sim.schedule(self.controller_delay, self._deliver, ofp_event.EventOFPPacketIn, msg)
+
+    # --- Traffico ---
+
+    def _fields(self, src, dst, proto, src_port, dst_port):
+        fields = {
+            "eth_src": src.mac, "eth_dst": dst.mac,
+            "eth_type": ether_types.ETH_TYPE_IP,
+            "ipv4_src": src.ip, "ipv4_dst": dst.ip,
+        }
+        if proto == "tcp":
+            fields.update(ip_proto=0x06, tcp_src=src_port, tcp_dst=dst_port)
+        elif proto == "udp":
+            fields.update(ip_proto=0x11, udp_src=src_port, udp_dst=dst_port)
+        return fields
+
+    def add_flow(self, flow_id, src, dst, kind, rate, size, start, stop,
+                 pattern="cbr", on=1.0, off=1.0):
+        """Flow di traffico tra due host (kind: video, udp, tcp)"""
+        if rate <= 0:
+            raise ValueError(f"rate del flow {flow_id} deve essere maggiore di 0")
+        if on < 0 or off < 0 or on + off <= 0:
+            raise ValueError(f"durate on/off del flow {flow_id} non valide")
+        proto = "tcp" if kind == "tcp" else "udp"
+        dst_port = VIDEO_PORT if kind == "video" else BASE_PORT + flow_id % PORT_RANGE
+        src_host, dst_host = self.hosts[src], self.hosts[dst]
+        cfg = {
+            "src": src, "dst": dst, "kind": kind, "rate": rate, "size": size,
+            "pattern": pattern, "on": on, "off": off, "start": start, "stop": stop,
+            "fields": self._fields(src_host, dst_host, proto, SRC_BASE_PORT + flow_id % PORT_RANGE, dst_port),
+            "interval": size * 8 / (rate * 1e6), "sent": 0,
+        }
+        self.flows[flow_id] = cfg
+        self.sim.schedule(start - self.sim.now, self._send_next, flow_id)
+
+    def _send_next(self, flow_id):
+        cfg = self.flows[flow_id]
+        now = self.sim.now
+        if now >= cfg["stop"]:
+            return
+        if is_on(cfg["pattern"], now - cfg["start"], cfg["on"], cfg["off"]):
+            pkt = Packet(cfg["fields"], cfg["size"], flow_id, cfg["sent"], now)
+            cfg["sent"] += 1
+            self.hosts[cfg["src"]].send(pkt)
+        self.sim.schedule(next_gap(cfg["pattern"], cfg["interval"]), self._send_next, flow_id)
+
+    def deliver(self, host, pkt):
+        if pkt.flow_id is None:
+            return
+        fields = pkt.fields
+        if fields.get("icmpv4_type") == icmp.ICMP_ECHO_REPLY:
+            self.ping_replies[(pkt.flow_id, pkt.seq)] = self.sim.now - pkt.sent
+            return
+        stats = self.flow_stats.setdefault(pkt.flow_id, FlowStats())
+        stats.update(pkt.seq, pkt.size, int(pkt.sent * 1e9), int(self.sim.now * 1e9))
+
+    # --- Monitor emulato (stesso schema di monitor_network.py) ---
+
+    def _ping(self, ping_id, src, target_ip, seq):
+        src_host = self.hosts[src]
+        dst_host = next(h for h in self.hosts.values() if h.ip == target_ip)
+        fields = {
+            "eth_src": src_host.mac, "eth_dst": dst_host.mac,
+            "eth_type": ether_types.ETH_TYPE_IP,
+            "ipv4_src": src_host.ip, "ipv4_dst": dst_host.ip,
+            "ip_proto": 0x01, "icmpv4_type": icmp.ICMP_ECHO_REQUEST,
+            "icmp_id": ping_id & 0xFFFF, "icmp_seq": seq,
+        }
+        src_host.send(Packet(fields, PING_SIZE, ping_id, seq, self.sim.now))
+
+    def _sample(self, second, rows, prev_bytes, ping_ids, wall_start):
+        timestamp = time.strftime("%H:%M:%S", time.localtime(wall_start + second))
+        for iface, cfg in INTERFACES.items():
+            switch, port = iface.split("-eth")
+            link = self.switches[switch].ports[int(port)]
+            curr = link.get_tx_bytes()
+            mbps = round(((curr - prev_bytes[iface]) * 8) / 1000000.0, 3)
+            prev_bytes[iface] = curr
+
+            ping_id = next(ping_ids)
+            for seq in range(PING_COUNT):
+                self.sim.schedule(seq * PING_INTERVAL, self._ping, ping_id, cfg["src"], cfg["target"], seq)
+            done = (PING_COUNT - 1) * PING_INTERVAL + PING_TIMEOUT
+            self.sim.schedule(done, self._finish_ping, rows, timestamp, cfg["label"], mbps, ping_id)
+
+    def _finish_ping(self, rows, timestamp, label, mbps, ping_id):
+        rtts = [self.ping_replies.pop((ping_id, seq)) * 1000 for seq in range(PING_COUNT)
+                if (ping_id, seq) in self.ping_replies]
+        rows.append([timestamp, label, mbps, *ping_summary(rtts)])
+
+    # --- Esecuzione ---
+
+    def run(self, duration):
+        """Esegue la simulazione e restituisce (righe CSV, risultati)"""
+        rows = []
+        prev_bytes = {iface: 0 for iface in INTERFACES}
+        # Gli id dei ping sono separati da quelli dei flow di traffico
+        ping_ids = itertools.count(1 << 30)
+        wall_start = time.time()
+
+        self.connect()
+        for second in range(1, int(duration) + 1):
+            self.sim.schedule(second - self.sim.now, self._sample, second, rows,
+                              prev_bytes, ping_ids, wall_start)
+
+        t0 = time.perf_counter()
+        self.sim.run(duration + PING_COUNT * PING_INTERVAL + PING_TIMEOUT)
+        wall = time.perf_counter() - t0
+
+        return rows, self.results(duration, wall)
+
+    def results(self, duration, wall):
+        flows = {}
+        kinds = {}
+        for flow_id, cfg in sorted(self.flows.items()):
+            stats = self.flow_stats.setdefault(flow_id, FlowStats())
+            # Come il marcatore di fine flow di traffic_gen.py
+            stats.finish(cfg["sent"])
+            summary = stats.summary()
+            summary.update(src=cfg["src"], dst=cfg["dst"], kind=cfg["kind"], sent=cfg["sent"])
+            flows[str(flow_id)] = summary
+
+            agg = kinds.setdefault(cfg["kind"], {"flows": 0, "sent": 0, "received": 0, "bytes": 0, "delay_sum": 0.0})
+            agg["flows"] += 1
+            agg["sent"] += cfg["sent"]
+            agg["received"] += summary["packets"]
+            agg["bytes"] += summary["bytes"]
+            agg["delay_sum"] += summary["delay_avg"] * summary["packets"]
+
+        for agg in kinds.values():
+            delay_sum = agg.pop("delay_sum")
+            agg["mbps"] = round(agg["bytes"] * 8 / duration / 1e6, 3)
+            agg["loss"] = round(100.0 * (agg["sent"] - agg["received"]) / agg["sent"], 3) if agg["sent"] else 0.0
+            agg["delay_avg"] = round(delay_sum / agg["received"], 3) if agg["received"] else 0.0
+
+        return {
+            "controller": type(self.app).__name__,
+            "multi_table": bool(getattr(self.app, "multi_table", False)),
+            "sim_duration": duration,
+            "wall_time": round(wall, 3),
+            "speedup": round(duration / wall, 2) if wall else None,
+            "events": self.sim.events,
+            "packet_in": self.packet_ins,
+            "tables": {name: s.occupancy() for name, s in self.switches.items()},
+            "link_drops": {f"{n}-eth{p}": l.dropped for (n, p), l in self.links.items() if l.dropped},
+            "buffer_drops": {name: s.buffer_drops for name, s in self.switches.items() if s.buffer_drops},
+            "kinds": kinds,
+            "flows": flows,
+        }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Emulatore a eventi discreti della rete di slicing")
+    parser.add_argument("--controller", choices=sorted(CONTROLLERS), default="service")
+    parser.add_argument("--multi-table", action="store_true", help="pipeline multi-table (solo service)")
+    parser.add_argument("--flows", type=int, default=100, help="numero di flow di traffico")
+    parser.add_argument("--kinds", default=",".join(FLOW_KINDS), help="tipi di flow, a rotazione")
+    parser.add_argument("--rate", type=float, default=0.01, help="Mbps per flow")
+    parser.add_argument("--size", type=int, default=1200, help="byte per pacchetto")
+    parser.add_argument("--pattern", choices=PATTERNS, default="cbr")
+    parser.add_argument("--on", type=float, default=1.0, help="durata ON (s) del pattern onoff")
+    parser.add_argument("--off", type=float, default=1.0, help="durata OFF (s) del pattern onoff")
+    parser.add_argument("--duration", type=float, default=30.0, help="secondi simulati")
+    parser.add_argument("--link-delay", type=float, default=DEFAULT_LINK_DELAY, help="ritardo di propagazione (s)")
+    parser.add_argument("--max-queue", type=int, default=DEFAULT_MAX_QUEUE, help="coda dei link (pacchetti)")
+    parser.add_argument("--controller-delay", type=float, default=DEFAULT_CONTROLLER_DELAY, help="latenza di controllo (s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="sim_traffic_data.csv", help="CSV nel formato di monitor_network.py")
+    parser.add_argument("--results", help="file JSON dei risultati per flow (default: stdout)")
+    args = parser.parse_args(argv)
+
+    if args.rate <= 0:
+        parser.error("--rate deve essere maggiore di 0")
+    if args.flows < 0:
+        parser.error("--flows non può essere negativo")
+    if args.on < 0 or args.off < 0 or args.on + args.off <= 0:
+        parser.error("--on e --off non possono essere negativi né entrambi nulli")
+
+    args.kinds = args.kinds.split(",")
+    unknown = set(args.kinds) - set(FLOW_KINDS)
+    if unknown:
+        parser.error(f"tipi di flow sconosciuti: {', '.join(sorted(unknown))}")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    random.seed(args.seed)
+
+    emulator = Emulator(
+        controller=args.controller,
+        multi_table=args.multi_table,
+        link_delay=args.link_delay,
+        max_queue=args.max_queue,
+        controller_delay=args.controller_delay,
+        seed=args.seed,
+    )
+    for i in range(args.flows):
+        src, dst = FLOW_PAIRS[i % len(FLOW_PAIRS)]
+        kind = args.kinds[(i // len(FLOW_PAIRS)) % len(args.kinds)]
+        # Avvii sfalsati nel primo secondo
+        start = emulator.random.random()
+        emulator.add_flow(i, src, dst, kind, args.rate, args.size, start, args.duration,
+                          args.pattern, args.on, args.off)
+
+    rows, results = emulator.run(args.duration)
+
+    with open(args.output, "w", newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_HEADER)
+        writer.writerows(rows)
+
+    output = json.dumps(results, indent=2)
+    if args.results:
+        with open(args.results, "w") as f: f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
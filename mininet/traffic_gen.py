@@ -0,0 +1,478 @@
+"""
+Generatore di traffico multi-flow basato su asyncio.
+
+Sostituisce le invocazioni di iperf: un solo processo genera molti flow
+UDP/TCP concorrenti e il ricevitore misura per ogni flow perdita,
+riordinamento e ritardo one-way tramite numeri di sequenza e timestamp.
+
+Uso (dentro gli host Mininet, es. con nsenter o dalla CLI di Mininet):
+    h3: python3 traffic_gen.py recv --port 9999 --duration 15 --output recv.json
+    h1: python3 traffic_gen.py send --dst 10.0.0.3 --port 9999 --flows 8 --rate 1
+Uso in locale (CI, senza Mininet):
+    python3 traffic_gen.py loopback --flows 8 --rate 1 --duration 3
+"""
+import argparse
+import asyncio
+import heapq
+import json
+import random
+import socket
+import struct
+import sys
+import time
+
+# Header di ogni pacchetto: flow_id, seq, lunghezza, timestamp di invio (ns)
+HEADER = struct.Struct("!IIIQ")
+MIN_SIZE = HEADER.size
+
+# Marcatore di fine flow: seq = FIN_SEQ e nel campo lunghezza il numero
+# di pacchetti inviati. Su UDP viene ripetuto per resistere alle perdite.
+FIN_SEQ = 0xFFFFFFFF
+FIN_REPEAT = 3
+
+# Finestra (in numeri di sequenza sotto il massimo) per riconoscere i duplicati
+SEQ_WINDOW = 1024
+
+# Intervallo minimo tra due risvegli del sender e numero massimo di
+# pacchetti per flow inviati per risveglio (invio a lotti, in stile sendmmsg)
+TICK = 0.001
+BATCH_SIZE = 64
+
+PATTERNS = ("cbr", "onoff", "poisson")
+
+
+def build_packet(flow_id, seq, size):
+    """Crea un pacchetto di 'size' byte con header e padding"""
+    header = HEADER.pack(flow_id, seq, size, time.time_ns())
+    return header + bytes(size - MIN_SIZE)
+
+
+def build_fin(flow_id, sent):
+    """Marcatore di fine flow con il totale dei pacchetti inviati"""
+    return HEADER.pack(flow_id, FIN_SEQ, sent, time.time_ns())
+
+
+def next_gap(pattern, interval):
+    """Tempo fino al prossimo pacchetto secondo il pattern scelto"""
+    if pattern == "poisson":
+        return random.expovariate(1.0 / interval)
+    return interval
+
+
+def is_on(pattern, elapsed, on_time, off_time):
+    """Nel pattern on/off il flow trasmette solo nei periodi ON"""
+    if pattern != "onoff":
+        return True
+    return (elapsed % (on_time + off_time)) < on_time
+
+
+# --- SENDER ---
+
+def _packet_schedule(cfg, start, now, state):
+    """
+    Restituisce quanti pacchetti del flow sono scaduti fino a 'now'
+    (al massimo BATCH_SIZE) aggiornando lo stato di schedulazione.
+    """
+    due = 0
+    while state["next"] <= now and due < BATCH_SIZE:
+        elapsed = state["next"] - start
+        if is_on(cfg["pattern"], elapsed, cfg["on"], cfg["off"]):
+            due += 1
+        state["next"] += next_gap(cfg["pattern"], state["interval"])
+    return due
+
+
+def _open_udp(cfg, flow):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setblocking(False)
+    sock.connect((cfg["dst"], cfg["port"]))
+    flow["sock"] = sock
+
+
+async def _open_tcp(cfg, flow):
+    try:
+        _, flow["writer"] = await asyncio.open_connection(cfg["dst"], cfg["port"])
+    except OSError as e:
+        # Nessun ricevitore in ascolto: il flow resta nei risultati senza traffico
+        flow["stats"]["send_errors"] += 1
+        flow["stats"]["error"] = str(e)
+
+
+def _udp_send(flow, data):
+    """Invia un datagramma; False se il pacchetto non è partito"""
+    stats = flow["stats"]
+    try:
+        flow["sock"].send(data)
+    except BlockingIOError:
+        # Buffer del socket pieno: il pacchetto conta come scartato in invio
+        stats["send_blocked"] += 1
+        return False
+    except OSError:
+        # Es. ConnectionRefusedError (ICMP port unreachable): si continua a inviare
+        stats["send_errors"] += 1
+        return False
+    return True
+
+
+def _tcp_send(flow, data):
+    writer = flow["writer"]
+    if writer.transport.is_closing():
+        flow["stats"]["send_errors"] += 1
+        return False
+    writer.write(data)
+    return True
+
+
+async def _tcp_drain(flow):
+    try:
+        await flow["writer"].drain()
+    except OSError as e:
+        flow["stats"]["send_errors"] += 1
+        flow["stats"]["error"] = str(e)
+
+
+def _send_due(cfg, flow, start, now):
+    due = _packet_schedule(cfg, start, now, flow)
+    send = _udp_send if cfg["proto"] == "udp" else _tcp_send
+    stats = flow["stats"]
+    for _ in range(due):
+        if send(flow, build_packet(flow["id"], flow["seq"], cfg["size"])):
+            flow["seq"] += 1
+            stats["packets"] += 1
+            stats["bytes"] += cfg["size"]
+    return due
+
+
+async def _schedule_flows(cfg, flows):
+    """
+    Un solo task invia i pacchetti di tutti i flow: un heap ordina i
+    prossimi istanti di invio, si dorme fino al primo e a ogni risveglio
+    partono in un unico lotto i pacchetti scaduti di tutti i flow.
+    """
+    start = time.monotonic()
+    end = start + cfg["duration"]
+    for flow in flows:
+        flow["next"] = start
+    heap = [(start, i) for i in range(len(flows))]
+    while heap:
+        now = time.monotonic()
+        if now >= end:
+            break
+        served = []
+        while heap and heap[0][0] <= now:
+            served.append(heapq.heappop(heap)[1])
+        sent = [flows[i] for i in served if _send_due(cfg, flows[i], start, now)]
+        if cfg["proto"] == "tcp" and sent:
+            await asyncio.gather(*(_tcp_drain(flow) for flow in sent))
+        for i in served:
+            heapq.heappush(heap, (flows[i]["next"], i))
+        wake = min(heap[0][0], end)
+        await asyncio.sleep(max(wake - time.monotonic(), TICK))
+
+
+async def _finish_flows(cfg, flows):
+    """Marcatori di fine flow e chiusura delle connessioni"""
+    for flow in flows:
+        fin = build_fin(flow["id"], flow["seq"])
+        if cfg["proto"] == "udp":
+            for _ in range(FIN_REPEAT):
+                if not _udp_send(flow, fin):
+                    await asyncio.sleep(TICK)
+            flow["sock"].close()
+        elif _tcp_send(flow, fin):
+            await _tcp_drain(flow)
+
+    writers = [flow["writer"] for flow in flows if "writer" in flow]
+    for writer in writers:
+        writer.close()
+    for writer in writers:
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+
+
+async def run_sender(cfg):
+    """Avvia tutti i flow configurati e restituisce i contatori di invio"""
+    flows = []
+    for i in range(cfg["flows"]):
+        stats = {"packets": 0, "bytes": 0, "send_blocked": 0, "send_errors": 0}
+        flows.append({
+            "id": cfg["first_flow_id"] + i, "seq": 0, "stats": stats,
+            "interval": cfg["size"] * 8 / (cfg["rate"] * 1e6),
+        })
+
+    if cfg["proto"] == "udp":
+        for flow in flows:
+            _open_udp(cfg, flow)
+    else:
+        await asyncio.gather(*(_open_tcp(cfg, flow) for flow in flows))
+    # I flow TCP senza connessione non vengono schedulati
+    active = [flow for flow in flows if cfg["proto"] == "udp" or "writer" in flow]
+
+    start = time.monotonic()
+    try:
+        await _schedule_flows(cfg, active)
+    finally:
+        await _finish_flows(cfg, active)
+    duration = time.monotonic() - start
+
+    for flow in flows:
+        flow["stats"]["mbps"] = round(flow["stats"]["bytes"] * 8 / duration / 1e6, 3) if duration else 0.0
+    return {
+        "role": "sender",
+        "proto": cfg["proto"],
+        "pattern": cfg["pattern"],
+        "duration": round(duration, 3),
+        "flows": {str(flow["id"]): flow["stats"] for flow in flows},
+    }
+
+
+# --- RECEIVER ---
+
+class FlowStats:
+    """Statistiche di un flow lato ricevitore"""
+
+    def __init__(self):
+        self.packets = 0
+        self.bytes = 0
+        self.max_seq = -1
+        self.reordered = 0
+        self.duplicates = 0
+        self.late = 0
+        # Bitmap dei seq ricevuti: il bit i indica max_seq - i
+        self.window = 0
+        # Totale inviato, noto dal marcatore di fine flow
+        self.expected_total = None
+        self.delay_sum = 0.0
+        self.delay_min = None
+        self.delay_max = None
+        self.jitter = 0.0
+        self.last_transit = None
+        self.first_rx = None
+        self.last_rx = None
+
+    def finish(self, sent):
+        """Registra il numero di pacchetti inviati dal sender"""
+        self.expected_total = sent
+
+    def update(self, seq, size, sent_ns, recv_ns):
+        if seq > self.max_seq:
+            shift = seq - self.max_seq
+            if shift >= SEQ_WINDOW:
+                # Salto oltre la finestra: nessun seq precedente resta tracciato
+                self.window = 1
+            else:
+                self.window = ((self.window << shift) | 1) & ((1 << SEQ_WINDOW) - 1)
+            self.max_seq = seq
+        else:
+            offset = self.max_seq - seq
+            if offset >= SEQ_WINDOW:
+                # Troppo in ritardo per distinguere un duplicato
+                self.late += 1
+            elif self.window >> offset & 1:
+                self.duplicates += 1
+                return
+            else:
+                self.window |= 1 << offset
+            self.reordered += 1
+        self.packets += 1
+        self.bytes += size
+
+        # Ritardo one-way (richiede clock condivisi, vero in Mininet)
+        delay = (recv_ns - sent_ns) / 1e6
+        self.delay_sum += delay
+        self.delay_min = delay if self.delay_min is None else min(self.delay_min, delay)
+        self.delay_max = delay if self.delay_max is None else max(self.delay_max, delay)
+
+        # Jitter interarrivo come in RFC 3550
+        if self.last_transit is not None:
+            self.jitter += (abs(delay - self.last_transit) - self.jitter) / 16
+        self.last_transit = delay
+
+        if self.first_rx is None:
+            self.first_rx = recv_ns
+        self.last_rx = recv_ns
+
+    def summary(self):
+        expected = max(self.max_seq + 1, self.expected_total or 0)
+        lost = max(expected - self.packets, 0)
+        if expected:
+            loss = round(100.0 * lost / expected, 3)
+        else:
+            # Flow atteso ma mai ricevuto (nemmeno il marcatore di fine)
+            loss = 100.0 if self.expected_total is None else 0.0
+        elapsed = (self.last_rx - self.first_rx) / 1e9 if self.packets > 1 else 0
+        return {
+            "packets": self.packets,
+            "bytes": self.bytes,
+            "expected": expected,
+            "lost": lost,
+            "loss": loss,
+            "reordered": self.reordered,
+            "duplicates": self.duplicates,
+            "late": self.late,
+            "mbps": round(self.bytes * 8 / elapsed / 1e6, 3) if elapsed else 0.0,
+            "delay_avg": round(self.delay_sum / self.packets, 3) if self.packets else 0.0,
+            "delay_min": round(self.delay_min or 0.0, 3),
+            "delay_max": round(self.delay_max or 0.0, 3),
+            "jitter": round(self.jitter, 3),
+        }
+
+
+def _record(flows, data):
+    recv_ns = time.time_ns()
+    if len(data) < MIN_SIZE:
+        return
+    flow_id, seq, size, sent_ns = HEADER.unpack_from(data)
+    if seq == FIN_SEQ:
+        flows.setdefault(flow_id, FlowStats()).finish(size)
+        return
+    flows.setdefault(flow_id, FlowStats()).update(seq, size, sent_ns, recv_ns)
+
+
+class _UdpReceiver(asyncio.DatagramProtocol):
+    def __init__(self, flows):
+        self.flows = flows
+
+    def datagram_received(self, data, addr):
+        _record(self.flows, data)
+
+
+async def _tcp_client(reader, writer, flows):
+    try:
+        while True:
+            header = await reader.readexactly(MIN_SIZE)
+            _, seq, size, _ = HEADER.unpack(header)
+            if seq != FIN_SEQ:
+                await reader.readexactly(size - MIN_SIZE)
+            _record(flows, header)
+    except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+        # Connessione chiusa dal sender o ricevitore in chiusura a fine durata
+        pass
+    finally:
+        writer.close()
+
+
+def receiver_result(cfg, flows):
+    return {
+        "role": "receiver",
+        "proto": cfg["proto"],
+        "flows": {str(k): v.summary() for k, v in sorted(flows.items())},
+    }
+
+
+async def run_receiver(cfg, ready=None, flows=None):
+    """Riceve per 'duration' secondi e restituisce le statistiche per flow"""
+    loop = asyncio.get_running_loop()
+    if flows is None:
+        flows = {}
+    # Flow attesi: compaiono nel risultato anche se non arriva nulla
+    for i in range(cfg.get("flows") or 0):
+        flows.setdefault(cfg["first_flow_id"] + i, FlowStats())
+
+    if cfg["proto"] == "udp":
+        transport, _ = await loop.create_datagram_endpoint(
+            lambda: _UdpReceiver(flows), local_addr=(cfg["bind"], cfg["port"])
+        )
+        sock = transport.get_extra_info("socket")
+        # Buffer ampio per non perdere pacchetti durante i burst
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+        closer = transport.close
+    else:
+        server = await asyncio.start_server(
+            lambda r, w: _tcp_client(r, w, flows), cfg["bind"], cfg["port"]
+        )
+        closer = server.close
+
+    if ready is not None:
+        ready.set()
+    try:
+        await asyncio.sleep(cfg["duration"])
+    finally:
+        closer()
+
+    return receiver_result(cfg, flows)
+
+
+async def run_loopback(cfg):
+    """Sender e ricevitore nello stesso processo su 127.0.0.1"""
+    recv_cfg = dict(cfg, bind="127.0.0.1", duration=cfg["duration"] + 1)
+    send_cfg = dict(cfg, dst="127.0.0.1")
+    ready = asyncio.Event()
+    flows = {}
+    recv_task = asyncio.ensure_future(run_receiver(recv_cfg, ready, flows))
+    await ready.wait()
+    sent = await run_sender(send_cfg)
+    await recv_task
+
+    # Riconciliazione con i contatori del sender (marcatori di fine persi)
+    for flow_id, stats in sent["flows"].items():
+        flows.setdefault(int(flow_id), FlowStats()).finish(stats["packets"])
+    return {"sender": sent, "receiver": receiver_result(recv_cfg, flows)}
+
+
+# --- CLI ---
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generatore di traffico multi-flow")
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--proto", choices=("udp", "tcp"), default="udp")
+    common.add_argument("--port", type=int, default=9999)
+    common.add_argument("--duration", type=float, default=10.0, help="secondi")
+    common.add_argument("--output", help="file JSON dei risultati (default: stdout)")
+
+    flows = argparse.ArgumentParser(add_help=False)
+    flows.add_argument("--flows", type=int, default=1, help="numero di flow concorrenti")
+    flows.add_argument("--first-flow-id", type=int, default=0)
+    flows.add_argument("--rate", type=float, default=1.0, help="Mbps per flow")
+    flows.add_argument("--size", type=int, default=1200, help="byte per pacchetto")
+    flows.add_argument("--pattern", choices=PATTERNS, default="cbr")
+    flows.add_argument("--on", type=float, default=1.0, help="durata ON (s) del pattern onoff")
+    flows.add_argument("--off", type=float, default=1.0, help="durata OFF (s) del pattern onoff")
+
+    send = sub.add_parser("send", parents=[common, flows], help="genera traffico")
+    send.add_argument("--dst", required=True, help="IP di destinazione")
+
+    recv = sub.add_parser("recv", parents=[common], help="riceve e misura il traffico")
+    recv.add_argument("--bind", default="0.0.0.0")
+    recv.add_argument("--flows", type=int, default=0, help="flow attesi (riportati anche se persi)")
+    recv.add_argument("--first-flow-id", type=int, default=0)
+
+    sub.add_parser("loopback", parents=[common, flows], help="test locale su 127.0.0.1")
+
+    args = parser.parse_args(argv)
+    if getattr(args, "size", MIN_SIZE) < MIN_SIZE:
+        parser.error(f"--size deve essere almeno {MIN_SIZE} byte")
+    if hasattr(args, "rate"):
+        if args.rate <= 0:
+            parser.error("--rate deve essere maggiore di 0")
+        if args.flows < 1:
+            parser.error("--flows deve essere almeno 1")
+        if args.on < 0 or args.off < 0 or args.on + args.off <= 0:
+            parser.error("--on e --off non possono essere negativi né entrambi nulli")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    cfg = {k.replace("-", "_"): v for k, v in vars(args).items()}
+
+    if args.mode == "send":
+        result = asyncio.run(run_sender(cfg))
+    elif args.mode == "recv":
+        result = asyncio.run(run_receiver(cfg))
+    else:
+        result = asyncio.run(run_loopback(cfg))
+
+    output = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as f: f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
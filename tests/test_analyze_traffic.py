@@ -0,0 +1,62 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "mininet"))
+
+try:
+    import analyze_traffic
+except ImportError:
+    analyze_traffic = None
+
+LABEL = "s1-eth1"
+
+
+@unittest.skipIf(analyze_traffic is None, "numpy/pandas non installati")
+class SlaIntervalsTest(unittest.TestCase):
+
+    def analyze(self, rows, chunk_rows=None):
+        """rows: (timestamp, loss); una riga è in violazione se loss > 10"""
+        fd, path = tempfile.mkstemp(suffix=".csv")
+        self.addCleanup(os.remove, path)
+        with os.fdopen(fd, "w") as f:
+            f.write(",".join(analyze_traffic.COLUMNS) + "\n")
+            for timestamp, loss in rows:
+                f.write(f"{timestamp},{LABEL},1.0,5.0,0.1,{loss}\n")
+        kwargs = {"chunk_rows": chunk_rows} if chunk_rows else {}
+        return analyze_traffic.analyze_csv(path, 10.0, 100.0, **kwargs)["slices"][LABEL]
+
+    def intervals(self, summary):
+        return [(i["start"], i["end"], i["seconds"]) for i in summary["sla_intervals"]]
+
+    def test_chunk_size_does_not_change_result(self):
+        losses = [0, 50, 50, 0, 50, 0, 0, 50, 50, 50, 50, 0, 50]
+        rows = [("12:00:%02d" % i, loss) for i, loss in enumerate(losses)]
+        reference = self.analyze(rows)
+        for chunk_rows in (1, 2, 3, 5):
+            self.assertEqual(self.analyze(rows, chunk_rows), reference)
+        self.assertEqual(self.intervals(reference), [
+            ("12:00:01", "12:00:02", 2.0),
+            ("12:00:04", "12:00:04", 1.0),
+            ("12:00:07", "12:00:10", 4.0),
+            ("12:00:12", "12:00:12", 1.0),
+        ])
+        self.assertEqual(reference["sla_violation_seconds"], 8.0)
+
+    def test_interval_closes_on_first_row_of_chunk(self):
+        # Intervallo aperto nel primo blocco e chiuso dalla prima riga del secondo
+        rows = [("08:00:00", 0), ("08:00:01", 50), ("08:00:02", 50), ("08:00:03", 0)]
+        summary = self.analyze(rows, chunk_rows=3)
+        self.assertEqual(self.intervals(summary), [("08:00:01", "08:00:02", 2.0)])
+
+    def test_midnight_wrap(self):
+        rows = [("23:59:57", 0), ("23:59:58", 50), ("23:59:59", 50),
+                ("00:00:00", 50), ("00:00:01", 0), ("00:00:02", 50)]
+        expected = [("23:59:58", "+1d 00:00:00", 3.0), ("+1d 00:00:02", "+1d 00:00:02", 1.0)]
+        for chunk_rows in (None, 1, 2, 3):
+            self.assertEqual(self.intervals(self.analyze(rows, chunk_rows)), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "mininet"))
+
+try:
+    import emulator
+except ImportError:
+    emulator = None
+
+
+@unittest.skipIf(emulator is None, "ryu non installato")
+class PingSummaryTest(unittest.TestCase):
+
+    def test_equal_rtts(self):
+        # RTT identici: la varianza può risultare appena negativa per arrotondamento
+        for rtt in (0.1, 2.0, 4.0000000000000036, 20.000000000000018):
+            avg, mdev, loss = emulator.ping_summary([rtt] * emulator.PING_COUNT)
+            self.assertEqual(avg, round(rtt, 3))
+            self.assertEqual(mdev, 0.0)
+            self.assertEqual(loss, 0.0)
+
+    def test_no_replies(self):
+        self.assertEqual(emulator.ping_summary([]), (0, 0, 100))
+
+
+@unittest.skipIf(emulator is None, "ryu non installato")
+class PacketBytesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.emu = emulator.Emulator()
+
+    def assert_round_trip(self, pkt):
+        back = emulator.Packet.from_bytes(pkt.to_bytes())
+        self.assertEqual(back.fields, pkt.fields)
+        self.assertEqual((back.flow_id, back.seq, back.size), (pkt.flow_id, pkt.seq, pkt.size))
+        self.assertAlmostEqual(back.sent, pkt.sent)
+
+    def test_flows_keep_identity(self):
+        # Un packet-out senza buffer deve restare associato al suo flow
+        for flow_id, kind in enumerate(("video", "udp", "tcp")):
+            self.emu.add_flow(flow_id, "h1", "h2", kind, 1.0, 1000, 0.0, 1.0)
+            cfg = self.emu.flows[flow_id]
+            self.assert_round_trip(emulator.Packet(cfg["fields"], 1000, flow_id, 7, 1.5))
+
+    def test_ping_keeps_identity(self):
+        h1, h2 = self.emu.hosts["h1"], self.emu.hosts["h2"]
+        fields = {
+            "eth_src": h1.mac, "eth_dst": h2.mac,
+            "eth_type": emulator.ether_types.ETH_TYPE_IP,
+            "ipv4_src": h1.ip, "ipv4_dst": h2.ip,
+            "ip_proto": 0x01, "icmpv4_type": emulator.icmp.ICMP_ECHO_REQUEST,
+            "icmp_id": 3, "icmp_seq": 2,
+        }
+        self.assert_round_trip(emulator.Packet(fields, emulator.PING_SIZE, 3, 2, 0.25))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import asyncio
+import os
+import socket
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "mininet"))
+
+import traffic_gen
+from traffic_gen import FlowStats, SEQ_WINDOW
+
+
+def feed(seqs, sent=None):
+    stats = FlowStats()
+    for seq in seqs:
+        stats.update(seq, 100, 0, 1000000)
+    if sent is not None:
+        stats.finish(sent)
+    return stats.summary()
+
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class FlowStatsTest(unittest.TestCase):
+
+    def test_in_order(self):
+        s = feed(range(10), sent=10)
+        self.assertEqual((s["packets"], s["expected"], s["lost"], s["loss"]), (10, 10, 0, 0.0))
+        self.assertEqual((s["reordered"], s["duplicates"], s["late"]), (0, 0, 0))
+        self.assertEqual(s["bytes"], 1000)
+        self.assertEqual(s["delay_avg"], 1.0)
+
+    def test_reordered(self):
+        s = feed([0, 2, 1, 3])
+        self.assertEqual((s["packets"], s["lost"], s["reordered"], s["duplicates"]), (4, 0, 1, 0))
+
+    def test_duplicate(self):
+        s = feed([0, 1, 1, 2])
+        self.assertEqual((s["packets"], s["lost"], s["duplicates"], s["reordered"]), (3, 0, 1, 0))
+
+    def test_late(self):
+        # Oltre la finestra il pacchetto non si distingue da un duplicato
+        s = feed([0, SEQ_WINDOW + 5, 1])
+        self.assertEqual((s["packets"], s["late"], s["reordered"]), (3, 1, 1))
+        self.assertEqual(s["expected"], SEQ_WINDOW + 6)
+        self.assertEqual(s["lost"], SEQ_WINDOW + 3)
+
+    def test_tail_loss(self):
+        # Senza il marcatore di fine la perdita in coda non sarebbe visibile
+        s = feed(range(5), sent=10)
+        self.assertEqual((s["expected"], s["lost"], s["loss"]), (10, 5, 50.0))
+
+    def test_never_received(self):
+        self.assertEqual(feed([])["loss"], 100.0)
+        s = feed([], sent=5)
+        self.assertEqual((s["expected"], s["lost"], s["loss"]), (5, 5, 100.0))
+        self.assertEqual(feed([], sent=0)["loss"], 0.0)
+
+
+class LoopbackTest(unittest.TestCase):
+
+    def run_loopback(self, proto):
+        args = traffic_gen.parse_args([
+            "loopback", "--proto", proto, "--port", str(free_port()),
+            "--flows", "2", "--rate", "0.5", "--duration", "0.5",
+        ])
+        cfg = {k.replace("-", "_"): v for k, v in vars(args).items()}
+        return asyncio.run(traffic_gen.run_loopback(cfg))
+
+    def test_udp_without_loss(self):
+        result = self.run_loopback("udp")
+        sent = result["sender"]["flows"]
+        received = result["receiver"]["flows"]
+        self.assertEqual(sorted(received), ["0", "1"])
+        for flow_id, stats in received.items():
+            self.assertGreater(stats["packets"], 0)
+            self.assertEqual(stats["packets"], sent[flow_id]["packets"])
+            self.assertEqual(stats["loss"], 0.0)
+
+    def test_tcp_without_loss(self):
+        result = self.run_loopback("tcp")
+        for stats in result["receiver"]["flows"].values():
+            self.assertGreater(stats["packets"], 0)
+            self.assertEqual(stats["loss"], 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()